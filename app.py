@@ -1,10 +1,11 @@
+import json
 import streamlit as st
 from OSMPythonTools.overpass import Overpass, overpassQueryBuilder
 import osm
-import h3
+from h3.unstable import vect as h3_vect
 H3_LEVEL = 12
+import numpy as np
 import pandas as pd
-import itertools as itt
 import pydeck as pdk
 
 st.set_page_config(layout="wide")
@@ -28,6 +29,8 @@ os_conn.reverse_geocode(lat=10, lon=10, zoom=18)
 os_conn.query_overpass_with_builder(area=sf, elementType='node', selector='"amenity"="restaurant"') 
 #find all restaurants in a bounding box using raw Overpass query
 os_conn.query_overpass_raw("(node[amenity=restaurant](-20.1984472, -84.6356535, -0.0392818, -68.6519906);) out body;")
+#same, but as an Arrow table of node coordinates and tags, cached on disk
+os_conn.query_overpass_nodes("(node[amenity=restaurant](-20.1984472, -84.6356535, -0.0392818, -68.6519906);) out body;")
 ```
 
 Underlying API objects can be retrieved with `osm_cursor()`, `nominativ_cursor()` and `overpass_cursor()` methods.
@@ -65,16 +68,88 @@ poi_colors = {
     'Grocery stores and supermarkets': [128,177,211] 
 }
 
-def show_rectangle(context, rgb_colors, label):
-    context.write(
-        f"""<svg xmlns="http://www.w3.org/2000/svg" width="220" height="30">
+# flat (tag key, tag value) -> category index lookup, so each POI needs one dict probe per tag
+TAG_TO_CATEGORY_IDX = {(key, value): idx for idx, (key, values) in enumerate(poi_categories.values()) for value in values}
+# category index -> RGB, in poi_categories order
+POI_PALETTE = np.array([poi_colors[name] for name in poi_categories], dtype=np.uint8)
+
+# tags not listed in tooltips - the name heads each POI's block instead
+SKIPPED_TAG_PREFIXES = ("addr:", "name")
+
+def poi_category(tags):
+    for tag in tags.items():
+        category = TAG_TO_CATEGORY_IDX.get(tag)
+        if category is not None:
+            return category
+
+@st.cache_data(show_spinner=False)
+def build_pois(_conn, query, level):
+    """H3-indexed POIs (at most 10,000) returned by an Overpass query, aggregated to one row per cell"""
+    results = _conn.query_overpass_nodes(query)
+    result_nodes = results.slice(0, 10_000)
+    node_tags = [json.loads(t) for t in result_nodes["tags_json"].to_pylist()]
+    n = len(node_tags)
+    # fill one array per column in a single pass instead of building a dict per POI
+    names = [None] * n
+    categories = np.empty(n, dtype=np.uint8)
+    tags = [None] * n
+    for i, poi_tags in enumerate(node_tags):
+        names[i] = poi_tags["name"]
+        categories[i] = poi_category(poi_tags)
+        # one tooltip block per POI: its name, then the remaining tags
+        tags[i] = "<br>".join([f"<b>{names[i]}</b>"] + [f"{k}: {v}" for k,v in poi_tags.items() if not k.startswith(SKIPPED_TAG_PREFIXES)])
+    lats = result_nodes["lat"].to_numpy()
+    lons = result_nodes["lon"].to_numpy()
+    # index all POIs in one vectorized call instead of one geo_to_h3 call per node
+    # deck.gl expects string ids - 64-bit integers lose precision in JS
+    hexes = np.char.mod("%x", h3_vect.geo_to_h3(lats, lons, level)).tolist()
+    # each POI carries a uint8 category id rather than a per-row color list
+    frame = pd.DataFrame({
+        "hex": hexes,
+        "category": categories,
+        "tags": tags,
+    })
+
+    # one row per H3 cell, so clustered POIs don't ship duplicate hexagons to the browser
+    cells = frame.groupby("hex", sort=False, as_index=False).agg(
+        tags=("tags", "<hr>".join),
+        count=("tags", "size"),
+    )
+    # each cell is drawn in the color of its most common category
+    category_counts = frame.groupby(["hex", "category"], sort=False).size().reset_index(name="n")
+    dominant = category_counts.loc[category_counts.groupby("hex", sort=False)["n"].idxmax(), ["hex", "category"]]
+    return cells.merge(dominant, on="hex")
+
+def category_layer(category_cells, color):
+    """Map layer for the cells of one POI category"""
+    return pdk.Layer(
+        "H3HexagonLayer",
+        data=category_cells,
+        pickable=True,
+        stroked=True,
+        filled=True,
+        extruded=False,
+        get_hexagon="hex",
+        get_fill_color=color,
+        get_line_color=[255, 255, 255],
+        line_width_min_pixels=2,
+    )
+
+def legend_svg(rgb_colors, label):
+    return f"""<svg xmlns="http://www.w3.org/2000/svg" width="220" height="30">
             <g>      
                 <rect x=0 y=0 width="100%" height="100%" style="fill:rgb({', '.join([str(c) for c in rgb_colors])})" />
                 <text x="50%" y="50%" dominant-baseline="middle" text-anchor="middle" font-family="Verdana" font-size="10" fill="black">{label}</text>
             </g>
-            </svg>""", 
-        unsafe_allow_html=True
-    )
+            </svg>"""
+
+# legend entries are fixed; caching keeps the markup across reruns, as Streamlit re-executes the script each time
+@st.cache_resource
+def legend_svgs():
+    return {name: legend_svg(color, name) for name, color in poi_colors.items()}
+
+def show_rectangle(context, label):
+    context.write(legend_svgs()[label], unsafe_allow_html=True)
 
 place_name = st.text_input("Choose a city/town/village", on_change=st.balloons)
 if place_name:    
@@ -98,44 +173,31 @@ if place_name:
             format_func= lambda p: p[0]
         )
         if len(choices):
-            selectors = []
-            for _, choice in choices:
-                selectors += [k + "=" + v for k,v in zip([choice[0]] * len(choice[1]), choice[1])]
+            selectors = [f"{key}={value}" for _, (key, values) in choices for value in values]
 
             lat1, lat2, lon1, lon2 = selection['boundingbox']
             bbox_string = ", ".join([lat1, lon1, lat2, lon2])
-            nodes = [f"""node[{selector}]({bbox_string});""" for selector in selectors]
+            # only named POIs are displayed, so let Overpass drop the rest
+            nodes = [f"""node[{selector}]["name"]({bbox_string});""" for selector in selectors]
             query = """
             (
                 {}
-            ); out center; out body;""".format("\n ".join(nodes))
+            ); out body qt;""".format("\n ".join(nodes))
                         
-            results =  osm_conn.query_overpass_raw(query)
-            if results.countElements() == 0:
+            results =  osm_conn.query_overpass_nodes(query)
+            if results.num_rows == 0:
                 st.warning("No points of interest found - try another category or choose a different location")
             else:
-                st.info(f"Found a total of {results.countElements()} points of interest in {selection['display_name']}")
-                if results.countElements() > 10_000:
+                st.info(f"Found a total of {results.num_rows} points of interest in {selection['display_name']}")
+                if results.num_rows > 10_000:
                     st.warning("Displaying only the first 10,000 results")
-                pois = [{                
-                    "Name": poi.tag("name"),                
-                    "hex": h3.geo_to_h3(poi.lat(), poi.lon(), H3_LEVEL),  
-                    "color": poi_colors[[name for name, vals in poi_categories.items() if len(set(poi.tags().values()).intersection(set(vals[1]))) > 0][0]],
-                    "tags": "<br>".join([k + ": " + v for k,v in poi.tags().items() if 'addr' not in k and 'name' not in k])
-                } for poi in results.nodes()[:10_000] if poi.tag("name") is not None]            
-                
-                layer = pdk.Layer(
-                    "H3HexagonLayer",
-                    data=pd.DataFrame(pois),
-                    pickable=True,
-                    stroked=True,
-                    filled=True,
-                    extruded=False,
-                    get_hexagon="hex",
-                    get_fill_color="color",
-                    get_line_color=[255, 255, 255],
-                    line_width_min_pixels=2,
-                )
+                cells = build_pois(osm_conn, query, H3_LEVEL)
+
+                # one layer per category, so the fill color is a constant instead of a per-row attribute
+                layers = [
+                    category_layer(category_cells, POI_PALETTE[category].tolist())
+                    for category, category_cells in cells.groupby("category", sort=False)
+                ]
 
                 # Set the viewport location
                 view_state = pdk.ViewState(
@@ -145,12 +207,12 @@ if place_name:
                 )            
                 # Render
                 r = pdk.Deck(
-                    layers=[layer], 
+                    layers=layers, 
                     initial_view_state=view_state, 
-                    tooltip={"html": "<b>Name: {Name}<b><br>{tags}"}, 
+                    tooltip={"html": "<b>POIs in this area: {count}</b><hr>{tags}"}, 
                     map_style=None
                 )
-                for column, (name, color) in zip(st.columns(len(poi_colors)), poi_colors.items()):
-                    show_rectangle(column, color, name)
+                for column, name in zip(st.columns(len(poi_colors)), poi_colors):
+                    show_rectangle(column, name)
                 st.pydeck_chart(r)
             
\ No newline at end of file
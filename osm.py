@@ -1,4 +1,13 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import numpy as np
 import streamlit as st
+import pyarrow as pa
+import pyarrow.ipc as ipc
 from OSMPythonTools.overpass import Overpass, overpassQueryBuilder, OverpassResult #typing: ignore
 from OSMPythonTools.api import Api #typing: ignore
 from OSMPythonTools.nominatim import Nominatim, NominatimResult #typing: ignore
@@ -8,6 +17,7 @@ class OSMConnection(st.connections.ExperimentalBaseConnection[Api]):
     api: Api
     nominatim: Nominatim
     overpass: Overpass
+    cache_dir: str
 
     def _connect(self, cache_dir: str = 'cache') -> Api:
         """Creates OSM connection objects
@@ -18,6 +28,7 @@ class OSMConnection(st.connections.ExperimentalBaseConnection[Api]):
         Returns:
             Api: OSM API object
         """
+        self.cache_dir = cache_dir
         if cache_dir:
             from OSMPythonTools.cachingStrategy import CachingStrategy, JSON
             CachingStrategy.use(JSON, cacheDir = cache_dir)
@@ -120,7 +131,7 @@ class OSMConnection(st.connections.ExperimentalBaseConnection[Api]):
             osm_conn.query_overpass_raw("
                 (
                     node[amenity=restaurant](-20.1984472, -84.6356535, -0.0392818, -68.6519906);
-                ); out center; out body;"
+                ); out body qt;"
             )
             ```
 
@@ -130,4 +141,89 @@ class OSMConnection(st.connections.ExperimentalBaseConnection[Api]):
         Returns:
             OverpassResult: Overpass result set
         """
-        return _self.overpass.query(query, **kwargs)
\ No newline at end of file
+        return _self.overpass.query(query, **kwargs)
+
+    def query_overpass_many(self, queries: List[str], max_workers: int = 2, **kwargs) -> List[OverpassResult]:
+        """Run several independent raw Overpass queries concurrently
+        Requests are issued from a thread pool of at most `max_workers` threads, so their network
+        latency overlaps. The default of 2 matches the per-IP slot limit of the public Overpass server;
+        OSMPythonTools does not coordinate its rate limiting across threads, so more concurrent
+        requests are rejected with HTTP 429 rather than queued.
+
+        Example: 
+            ```
+            osm_conn = st.experimental_connection(name="osm", type=osm.OSMConnection, cache_dir="osm-cache")
+            vienna, graz = osm_conn.query_overpass_many([
+                "(node[amenity=restaurant](48.1, 16.3, 48.3, 16.5);); out body qt;",
+                "(node[amenity=restaurant](47.0, 15.4, 47.1, 15.5);); out body qt;",
+            ])
+            ```
+
+        Args:
+            queries (List[str]): Raw Overpass queries
+            max_workers (int): Maximum number of concurrent requests. Defaults to 2
+
+        Returns:
+            List[OverpassResult]: Overpass result sets, in the order of `queries`
+        """
+        if not queries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as pool:
+            return list(pool.map(lambda query: self.overpass.query(query, **kwargs), queries))
+
+    def query_overpass_nodes(self, query: str, **kwargs) -> pa.Table:
+        """Obtain OSM nodes by a direct query to Overpass API as a columnar Arrow table
+        with `lat`, `lon` and `tags_json` (JSON-encoded tag dictionary) columns.
+
+        Results are stored in `cache_dir` as Arrow IPC files keyed by a hash of the query and its
+        parameters, and are memory-mapped on later calls, so repeated queries skip both the network
+        round-trip and re-creating the Overpass result objects.
+
+        Example: 
+            ```
+            osm_conn = st.experimental_connection(name="osm", type=osm.OSMConnection, cache_dir="osm-cache")
+            nodes = osm_conn.query_overpass_nodes("
+                (
+                    node[amenity=restaurant](-20.1984472, -84.6356535, -0.0392818, -68.6519906);
+                ); out body;"
+            )
+            nodes["lat"].to_numpy()
+            ```
+
+        Args:
+            query (str): Raw Overpass query
+            **kwargs: Parameters passed to `Overpass.query` (e.g. `date`, `settings`)
+
+        Returns:
+            pa.Table: Table with one row per node
+        """
+        path = None
+        if self.cache_dir:
+            # query parameters such as `date` or `settings` change the result, so they are part of the key
+            key = repr((query, sorted(kwargs.items())))
+            path = os.path.join(self.cache_dir, f"overpass_{hashlib.sha1(key.encode()).hexdigest()}.arrow")
+            if os.path.exists(path):
+                with pa.memory_map(path) as source:
+                    return ipc.open_file(source).read_all()
+
+        # read coordinates and tags from the decoded response instead of calling each element's accessors
+        elements = self.overpass.query(query, **kwargs).toJSON()["elements"]
+        nodes = [element for element in elements if element["type"] == "node"]
+        table = pa.table({
+            "lat": np.fromiter((node["lat"] for node in nodes), dtype=np.float64, count=len(nodes)),
+            "lon": np.fromiter((node["lon"] for node in nodes), dtype=np.float64, count=len(nodes)),
+            "tags_json": pa.array([json.dumps(node.get("tags", {})) for node in nodes], type=pa.string()),
+        })
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a uniquely named temporary file first, so concurrent sessions (threads of
+            # the same process) neither clobber each other's writes nor read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="overpass_", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return table
\ No newline at end of file